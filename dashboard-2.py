@@ -1,10 +1,16 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import os
+import logging
+import tempfile
+import pyarrow as pa
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 # -----------------------------------------------------------------------------
 # 1. 환경 설정 및 비밀키 관리 (Secret Management)
 # -----------------------------------------------------------------------------
@@ -56,7 +62,7 @@ client_id, client_secret = get_naver_api_secrets()
 # -----------------------------------------------------------------------------
 @st.cache_data
 def load_data():
-    """데이터를 로드하고 캐싱합니다."""
+    """데이터를 로드하고 캐싱합니다. (데이터, 최소 주문일, 최대 주문일, 데이터 버전)을 반환합니다."""
     # 파일 경로 (절대 경로 또는 상대 경로)
     # ---------------------------
     # [Path Debugging Strategy]
@@ -99,16 +105,31 @@ def load_data():
         except Exception as e:
             st.write(f"Error listing dir: {e}")
             
-        return pd.DataFrame()
+        return pd.DataFrame(), None, None, None
+
+    # Parquet 캐시 확인 (CSV 파싱/타입 변환 결과를 재사용하여 콜드 스타트 단축)
+    # CSV 또는 이 스크립트가 더 최신이면 캐시를 무시하고 다시 생성
+    parquet_path = os.path.splitext(filepath)[0] + ".parquet"
+    source_mtime = max(os.path.getmtime(filepath), os.path.getmtime(os.path.abspath(__file__)))
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= source_mtime:
+        try:
+            df = pd.read_parquet(parquet_path)
+            return df, df['주문일'].min().date(), df['주문일'].max().date(), (source_mtime, len(df))
+        except (OSError, pa.ArrowException) as e:
+            # 손상된 캐시는 무시하고 CSV에서 다시 생성
+            logger.warning("Parquet 캐시를 읽지 못해 CSV에서 다시 생성합니다: %s (%s)", parquet_path, e)
 
     df = pd.read_csv(filepath)
     
     # 날짜 변환
     if '주문일' in df.columns:
         df['주문일'] = pd.to_datetime(df['주문일'])
-        df['주문월'] = df['주문일'].dt.to_period('M').astype(str)
+        df['주문월_period'] = df['주문일'].dt.to_period('M')
+        df['주문주_period'] = df['주문일'].dt.to_period('W')
+        df['주문월'] = df['주문월_period'].astype(str)
         df['주문시간'] = df['주문일'].dt.hour
         df['요일'] = df['주문일'].dt.day_name()
+        df['주문일자'] = df['주문일'].dt.normalize()  # 일별 집계용 (datetime64 키)
     
     # 숫자형 컬럼 변환 (콤마 제거)
     numeric_cols = ['결제금액', '판매단가', '공급단가', '주문취소 금액', '실결제 금액', '주문수량']
@@ -116,13 +137,58 @@ def load_data():
         if col in df.columns and df[col].dtype == object:
             df[col] = df[col].astype(str).str.replace(',', '').astype(float)
     
+    # 수량 컬럼 다운캐스트 (최소 정수형, 합계는 int64로 누적됨)
+    # 금액 컬럼은 float32로 줄이면 집계 합계가 틀어지므로 float64 유지
+    if '주문수량' in df.columns:
+        df['주문수량'] = pd.to_numeric(df['주문수량'], downcast='integer')
+    
     # 마진 계산
     if '판매단가' in df.columns and '공급단가' in df.columns:
         df['마진'] = (df['판매단가'] - df['공급단가']) * df.get('주문수량', 1)
+    
+    # 프롬프트 검색용 결합 컬럼 (검색 대상 컬럼을 소문자로 미리 이어 붙여 한 번에 검색)
+    search_cols = [c for c in ['상품명', '옵션코드', '주소', '주문경로', '목적', '고객선택옵션'] if c in df.columns]
+    if search_cols:
+        search_blob = df[search_cols[0]].astype(str)
+        for col in search_cols[1:]:
+            search_blob = search_blob + '\x1f' + df[col].astype(str)
+        df['_search_blob'] = search_blob.str.lower()
+    else:
+        df['_search_blob'] = ''
+    
+    # 이벤트 필터용 boolean 컬럼 (리런마다 문자열 비교를 하지 않도록 로드 시 1회 변환)
+    if '이벤트 여부' in df.columns:
+        df['이벤트 여부_bool'] = (df['이벤트 여부'] == 'Y').to_numpy()
+    
+    # 반복 사용되는 문자열 컬럼은 범주형으로 변환 (groupby/isin/unique가 정수 코드로 동작)
+    cat_cols = ['주문경로', '상품명', '셀러명', '광역지역', '무게 구분', '이벤트 여부', '옵션코드', 'UID', '요일', '주문월']
+    for col in cat_cols:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    
+    # 주문경로 범주는 원본 등장 순서를 유지 (사이드바 필터 옵션 순서)
+    if '주문경로' in df.columns:
+        df['주문경로'] = df['주문경로'].cat.reorder_categories(df['주문경로'].dropna().unique().tolist())
+    
+    # Parquet 캐시 저장 (읽기 전용 파일시스템 등에서 실패해도 앱은 계속 동작)
+    # 동시 세션이 쓰다 만 파일을 읽지 않도록 같은 폴더의 임시 파일에 쓴 뒤 원자적으로 교체
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(parquet_path) or ".", suffix=".parquet.tmp")
+        os.close(fd)
+        df.to_parquet(tmp_path, engine="pyarrow", compression="zstd")
+        os.replace(tmp_path, parquet_path)
+        tmp_path = None
+    except (OSError, pa.ArrowException) as e:
+        logger.warning("Parquet 캐시를 저장하지 못했습니다: %s (%s)", parquet_path, e)
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
         
-    return df
+    # 기간 선택 범위 (리런마다 전체 컬럼을 스캔하지 않도록 로드 시 1회 계산)
+    return df, df['주문일'].min().date(), df['주문일'].max().date(), (source_mtime, len(df))
 
-raw_df = load_data()
+raw_df, min_date, max_date, data_version = load_data()
 
 if raw_df.empty:
     st.stop()
@@ -130,13 +196,13 @@ if raw_df.empty:
 # -----------------------------------------------------------------------------
 # 3. 사이드바 및 프롬프트 (Sidebar & Prompt UI)
 # -----------------------------------------------------------------------------
+# 주문경로가 비어 있는 주문을 선택하기 위한 필터 옵션
+MISSING_CHANNEL_LABEL = "(주문경로 없음)"
+
 with st.sidebar:
     st.title("🎛️ 컨트롤 패널")
     
     # 기간 설정
-    min_date = raw_df['주문일'].min().date()
-    max_date = raw_df['주문일'].max().date()
-    
     date_range = st.date_input(
         "기간 선택",
         value=(min_date, max_date),
@@ -146,7 +212,9 @@ with st.sidebar:
     
     # 빠른 필터
     st.divider()
-    all_channels = raw_df['주문경로'].unique().tolist()
+    all_channels = raw_df['주문경로'].cat.categories.tolist()  # 범주형이므로 전체 스캔 없이 목록 조회
+    if raw_df['주문경로'].isna().any():
+        all_channels.append(MISSING_CHANNEL_LABEL)
     selected_channels = st.multiselect("주문 경로 필터", all_channels, default=all_channels)
     
     if '이벤트 여부' in raw_df.columns:
@@ -173,51 +241,136 @@ prompt = st.text_input(
 # -----------------------------------------------------------------------------
 # 4. 데이터 필터링 로직 (Filtering Logic)
 # -----------------------------------------------------------------------------
-df_filtered = raw_df.copy()
-
-# 1. 기간 필터
-if len(date_range) == 2:
-    start_date, end_date = date_range
-    df_filtered = df_filtered[
-        (df_filtered['주문일'].dt.date >= start_date) & 
-        (df_filtered['주문일'].dt.date <= end_date)
-    ]
+def filter_data(raw_df, date_range, channels, show_event_only, prompt):
+    """기간/채널/이벤트/검색어 조건으로 데이터를 필터링합니다."""
+    # 모든 조건을 하나의 boolean 마스크로 결합한 뒤 마지막에 한 번만 행을 추출
+    mask = np.ones(len(raw_df), dtype=bool)
+    
+    # 1. 기간 필터
+    if len(date_range) == 2:
+        start_date, end_date = date_range
+        # datetime64 그대로 비교 (종료일은 다음날 0시 미만으로 처리)
+        start_ts = pd.Timestamp(start_date).to_datetime64()
+        end_ts = (pd.Timestamp(end_date) + pd.Timedelta(days=1)).to_datetime64()
+        order_dates = raw_df['주문일'].to_numpy()
+        mask &= (order_dates >= start_ts) & (order_dates < end_ts)
+    
+    # 2. 채널 필터
+    if channels:
+        channel_mask = raw_df['주문경로'].isin(channels).to_numpy()
+        if MISSING_CHANNEL_LABEL in channels:
+            channel_mask |= raw_df['주문경로'].isna().to_numpy()
+        mask &= channel_mask
+    
+    # 3. 이벤트 필터
+    if show_event_only and '이벤트 여부' in raw_df.columns:
+        mask &= raw_df['이벤트 여부_bool'].to_numpy()
+    
+    # 4. 프롬프트(검색어) 필터 - 앞선 조건을 통과한 행의 _search_blob에서만 일반 문자열 검색
+    if prompt:
+        candidates = raw_df['_search_blob'][mask]
+        mask[mask] = candidates.str.contains(prompt.lower(), regex=False, na=False).to_numpy()
+    
+    # 모든 행이 조건을 통과하면 복사 없이 원본을 그대로 사용 (raw_df는 이후 수정하지 않음)
+    if mask.all():
+        return raw_df
+    return raw_df[mask]
+
+# 집계 결과 캐싱: 데이터 버전 + 필터 조건(filter_key)만 캐시 키로 사용하고, 필터링된 데이터(_df)는 해싱하지 않음
+# 검색어마다 항목이 늘어나므로 max_entries로 오래된 결과는 제거
+@st.cache_data(show_spinner=False, max_entries=64)
+def compute_kpis(_df, filter_key):
+    """KPI 지표를 계산하고 캐싱합니다."""
+    # Series 메서드 대신 NumPy 배열에서 직접 집계 (float64로 누적)
+    sales = _df['실결제 금액'].to_numpy()
+    total_orders = sales.size
+    total_sales = np.nansum(sales, dtype=np.float64)
+    avg_order_value = total_sales / total_orders if total_orders > 0 else 0
+    if '마진' in _df.columns and total_orders > 0:
+        avg_margin = np.nanmean(_df['마진'].to_numpy(), dtype=np.float64)
+    else:
+        avg_margin = 0
+    return total_sales, total_orders, avg_order_value, avg_margin
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def compute_product_rank(_df, filter_key, total_sales):
+    """상품별 판매 랭킹(매출 상위 100개)을 계산하고 캐싱합니다."""
+    prod_rank = _df.groupby('상품명', observed=True, sort=False).agg(
+        총주문수=('주문수량', 'sum'),
+        총매출=('실결제 금액', 'sum')
+    ).nlargest(100, '총매출').reset_index()  # 상위 100개만 부분 정렬
+    prod_rank['매출비중'] = (prod_rank['총매출'] / total_sales * 100).map('{:.1f}%'.format)
+    return prod_rank
 
-# 2. 채널 필터
-if selected_channels:
-    df_filtered = df_filtered[df_filtered['주문경로'].isin(selected_channels)]
+@st.cache_data(show_spinner=False, max_entries=64)
+def compute_vip_list(_df, filter_key):
+    """구매횟수 상위 20명의 VIP 고객 리스트를 계산하고 캐싱합니다."""
+    vip_df = _df.groupby('UID', observed=True, sort=False).agg(
+        구매횟수=('주문번호', 'count'),
+        총결제금액=('실결제 금액', 'sum')
+    )
+    # 상위 후보만 부분 정렬한 뒤(동률 포함), 구매횟수 → 총결제금액 → UID 순으로 고정 정렬
+    candidates = vip_df.nlargest(20, ['구매횟수', '총결제금액'], keep='all').reset_index()
+    return candidates.sort_values(
+        ['구매횟수', '총결제금액', 'UID'], ascending=[False, False, True]
+    ).head(20).set_index('UID')
 
-# 3. 이벤트 필터
-if show_event_only and '이벤트 여부' in df_filtered.columns:
-    df_filtered = df_filtered[df_filtered['이벤트 여부'] == 'Y']
+@st.cache_data(show_spinner=False, max_entries=64)
+def compute_churn_matrix(_df, filter_key):
+    """월별 셀러 신규 유입/이탈 현황을 계산하고 캐싱합니다."""
+    # 필터 결과가 없으면 빈 Period 컬럼으로 crosstab이 실패하므로 빈 결과 반환
+    if _df.empty:
+        return pd.DataFrame(columns=['월', '신규 유입', '이탈'])
+    
+    # 셀러 x 월 활동 여부 행렬 (월은 기간 순으로 정렬됨)
+    presence = pd.crosstab(_df['셀러명'], _df['주문월_period']) > 0
+    prev_presence = presence.shift(1, axis=1, fill_value=False)
+    
+    # 각 월별 신규 셀러수 - 해당 월이 셀러의 첫 활동 월인 경우
+    new_counts = (presence & (presence.cumsum(axis=1) == 1)).sum(axis=0)
+    
+    # 이탈 (Churn) - 전월에는 있었으나 이번달에는 없는 경우
+    churn_counts = (prev_presence & ~presence).sum(axis=0)
+    
+    analysis_df = pd.DataFrame({
+        '월': presence.columns.astype(str),
+        '신규 유입': new_counts.to_numpy(),
+        '이탈': churn_counts.to_numpy() * -1  # 음수로 표현
+    })
+    return analysis_df.sort_values('월')
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def compute_weekly_trend(_df, filter_key, sellers):
+    """선택한 셀러들의 주별 매출 추이를 계산하고 캐싱합니다."""
+    trend_df = _df[_df['셀러명'].isin(sellers)]
+    # 주 단위 Period 그대로 그룹핑하고, 문자열 변환은 집계된 소량의 결과에만 적용
+    trend_pivot = trend_df.groupby(['주문주_period', '셀러명'], observed=True)['실결제 금액'].sum().reset_index()
+    trend_pivot['주문주_period'] = trend_pivot['주문주_period'].astype(str)
+    trend_pivot.columns = ['기간(주)', '셀러명', '매출액']
+    return trend_pivot
+
+# 전체 채널 선택 시에는 채널 조건을 생략 (주문경로가 비어 있는 주문도 포함, isin 생략)
+channel_filter = () if set(selected_channels) == set(all_channels) else tuple(selected_channels)
+filter_args = (tuple(date_range), channel_filter, show_event_only, prompt)
+# 원본 데이터가 다시 로드되면(CSV/스크립트 변경) 이전 집계 캐시를 재사용하지 않도록 데이터 버전 포함
+filter_key = (data_version,) + filter_args
 
-# 4. 프롬프트(검색어) 필터 - 핵심 로직
 if prompt:
     with st.spinner(f"'{prompt}' 관련 데이터 분석 중..."):
-        # 검색 대상 컬럼
-        search_cols = ['상품명', '옵션코드', '주소', '주문경로', '목적', '고객선택옵션']
-        valid_cols = [c for c in search_cols if c in df_filtered.columns]
-        
-        # 키워드 포함 여부 마스크 생성 (OR 조건)
-        mask = pd.Series(False, index=df_filtered.index)
-        for col in valid_cols:
-            mask |= df_filtered[col].astype(str).str.contains(prompt, case=False)
-        
-        df_filtered = df_filtered[mask]
+        df_filtered = filter_data(raw_df, *filter_args)
         
-        if df_filtered.empty:
-            st.warning(f"'{prompt}'에 대한 검색 결과가 없습니다.")
-            st.stop()
-        else:
-            st.success(f"'{prompt}' 키워드로 {len(df_filtered):,}건의 데이터를 찾았습니다.")
+    if df_filtered.empty:
+        st.warning(f"'{prompt}'에 대한 검색 결과가 없습니다.")
+        st.stop()
+    else:
+        st.success(f"'{prompt}' 키워드로 {len(df_filtered):,}건의 데이터를 찾았습니다.")
+else:
+    df_filtered = filter_data(raw_df, *filter_args)
 
 # -----------------------------------------------------------------------------
 # 5. KPI 메트릭 (Metrics) [Table Like 1]
 # -----------------------------------------------------------------------------
-total_sales = df_filtered['실결제 금액'].sum()
-total_orders = len(df_filtered)
-avg_order_value = total_sales / total_orders if total_orders > 0 else 0
-avg_margin = df_filtered['마진'].mean() if '마진' in df_filtered.columns else 0
+total_sales, total_orders, avg_order_value, avg_margin = compute_kpis(df_filtered, filter_key)
 
 col1, col2, col3, col4 = st.columns(4)
 col1.metric("총 매출액", f"{total_sales:,.0f}원")
@@ -230,15 +383,18 @@ st.divider()
 # -----------------------------------------------------------------------------
 # 6. 메인 탭 구성 (Main Tabs)
 # -----------------------------------------------------------------------------
-tab1, tab2, tab3, tab4 = st.tabs(["📊 종합 분석", "🔍 심층 EDA (Deep Dive)", "👥 고객 데이터", "📈 셀러 분석"])
+# st.tabs는 보이지 않는 탭의 집계까지 매 리런마다 모두 실행하므로,
+# 라디오 버튼으로 탭을 선택하고 선택된 탭의 내용만 계산/렌더링
+tab_names = ["📊 종합 분석", "🔍 심층 EDA (Deep Dive)", "👥 고객 데이터", "📈 셀러 분석"]
+active_tab = st.radio("분석 탭", tab_names, horizontal=True, label_visibility="collapsed", key="active_tab")
 
-with tab1:
+if active_tab == tab_names[0]:
     col_chart1, col_chart2 = st.columns(2)
     
     # [Graph 1] 일별 매출 추이
     with col_chart1:
         st.subheader("📆 일별 매출 추이")
-        daily_sales = df_filtered.groupby(df_filtered['주문일'].dt.date)['실결제 금액'].sum().reset_index()
+        daily_sales = df_filtered.groupby('주문일자', sort=True)['실결제 금액'].sum().reset_index().rename(columns={'주문일자': '주문일'})
         fig_daily = px.line(daily_sales, x='주문일', y='실결제 금액', markers=True, template="plotly_white")
         fig_daily.update_layout(hovermode="x unified")
         st.plotly_chart(fig_daily, use_container_width=True)
@@ -250,30 +406,38 @@ with tab1:
             path_cols = ['상품명', '무게 구분']
         else:
             path_cols = ['상품명']
+        
+        # 행 단위 대신 경로별로 미리 합산하여 Plotly에 전달 (범주형은 문자열로 변환해 미사용 범주 제외)
+        # 색상은 행 단위 데이터와 동일하게 매출 가중 평균 결제금액(Σ금액² / Σ금액)을 유지
+        sales = df_filtered['실결제 금액']
+        path_keys = [df_filtered[c] for c in path_cols]
+        sun_df = pd.DataFrame({
+            '실결제 금액': sales.groupby(path_keys, observed=True, sort=False).sum(),
+            '_color': (sales.astype('float64') ** 2).groupby(path_keys, observed=True, sort=False).sum()
+        }).reset_index()
+        sun_df['_color'] = sun_df['_color'] / sun_df['실결제 금액']
+        sun_df[path_cols] = sun_df[path_cols].astype(str)
             
         fig_sun = px.sunburst(
-            df_filtered, 
+            sun_df, 
             path=path_cols, 
             values='실결제 금액',
-            color='실결제 금액',
-            color_continuous_scale='OrRd'
+            color='_color',
+            color_continuous_scale='OrRd',
+            labels={'_color': '실결제 금액'}
         )
         st.plotly_chart(fig_sun, use_container_width=True)
 
     # [Table 2] 상품별 판매 랭킹
     st.subheader("🏆 상품별 판매 성과")
-    prod_rank = df_filtered.groupby('상품명').agg(
-        총주문수=('주문수량', 'sum'),
-        총매출=('실결제 금액', 'sum')
-    ).reset_index().sort_values('총매출', ascending=False)
-    prod_rank['매출비중'] = (prod_rank['총매출'] / total_sales * 100).map('{:.1f}%'.format)
+    prod_rank = compute_product_rank(df_filtered, filter_key, total_sales)
     st.dataframe(prod_rank, use_container_width=True)
 
 
-with tab2:
+elif active_tab == tab_names[1]:
     # [Graph 3] 채널별 성과 비교
     st.subheader("📢 채널별 성과")
-    channel_perf = df_filtered.groupby('주문경로')[['실결제 금액', '마진']].sum().reset_index()
+    channel_perf = df_filtered.groupby('주문경로', observed=True)[['실결제 금액', '마진']].sum().reset_index()
     fig_channel = px.bar(
         channel_perf, x='주문경로', y='실결제 금액', 
         color='마진', title="주문경로별 매출 (색상: 마진)",
@@ -283,13 +447,28 @@ with tab2:
 
     col_deep1, col_deep2 = st.columns(2)
     
+    # 지역별 주문건수/매출 (차트와 상세 통계 표에서 공통 사용하도록 1회 집계)
+    if '광역지역' in df_filtered.columns:
+        region_all = df_filtered.groupby('광역지역', observed=True, sort=False).agg(
+            주문건수=('UID', 'count'),
+            총매출=('실결제 금액', 'sum')
+        )
+    
     # [Graph 4] 주문수량 vs 매출 산점도
     with col_deep1:
         st.subheader("📈 주문 패턴 (Scatter)")
+        # 데이터가 많으면 표본만 그려 Plotly 직렬화 비용을 제한
+        max_scatter_points = 20_000
+        if len(df_filtered) > max_scatter_points:
+            scatter_df = df_filtered.sample(max_scatter_points, random_state=0)
+            st.caption(f"전체 {len(df_filtered):,}건 중 {max_scatter_points:,}건을 표본으로 표시합니다.")
+        else:
+            scatter_df = df_filtered
         fig_scatter = px.scatter(
-            df_filtered, x='주문수량', y='실결제 금액', 
+            scatter_df, x='주문수량', y='실결제 금액', 
             color='주문경로', hover_data=['상품명'],
-            title="주문수량 vs 결제금액 상관관계"
+            title="주문수량 vs 결제금액 상관관계",
+            render_mode='webgl'  # 점이 많아도 브라우저 렌더링이 느려지지 않도록 WebGL 사용
         )
         st.plotly_chart(fig_scatter, use_container_width=True)
 
@@ -297,11 +476,11 @@ with tab2:
     with col_deep2:
         st.subheader("📊 지역별 매출 규모 (Bar)")
         if '광역지역' in df_filtered.columns:
-            region_stats = df_filtered.groupby('광역지역')['실결제 금액'].sum().reset_index().sort_values('실결제 금액', ascending=True)
+            region_stats = region_all.reset_index().sort_values('총매출', ascending=True)
             
             fig_bar_region = px.bar(
                 region_stats, 
-                x='실결제 금액', 
+                x='총매출', 
                 y='광역지역', 
                 orientation='h',
                 text_auto='.2s',
@@ -314,31 +493,27 @@ with tab2:
     # [Table 3] 지역별 통계
     st.subheader("📍 지역별 상세 통계")
     if '광역지역' in df_filtered.columns:
-        region_df = df_filtered.groupby('광역지역').agg(
-            주문건수=('UID', 'count'),
-            총매출=('실결제 금액', 'sum')
-        ).sort_values('총매출', ascending=False)
+        region_df = region_all.nlargest(20, '총매출')
         st.dataframe(region_df, use_container_width=True)
 
-with tab3:
+elif active_tab == tab_names[2]:
     col_cust1, col_cust2 = st.columns([1, 2])
     
     # [Table 4] VIP 고객 리스트
     with col_cust1:
         st.subheader("👑 VIP 고객 리스트")
         if 'UID' in df_filtered.columns:
-            vip_df = df_filtered.groupby('UID').agg(
-                구매횟수=('주문번호', 'count'),
-                총결제금액=('실결제 금액', 'sum')
-            ).sort_values('구매횟수', ascending=False).head(20)
+            vip_df = compute_vip_list(df_filtered, filter_key)
             st.dataframe(vip_df, use_container_width=True)
             
     # [Table 5] 원본 데이터 브라우저
     with col_cust2:
         st.subheader("📄 상세 데이터 조회")
-        st.dataframe(df_filtered, use_container_width=True)
+        # 내부 계산용 컬럼은 숨김
+        hidden_cols = ['_search_blob', '주문일자', '주문월_period', '주문주_period', '이벤트 여부_bool']
+        st.dataframe(df_filtered, use_container_width=True, column_config={c: None for c in hidden_cols})
 
-with tab4:
+elif active_tab == tab_names[3]:
     st.header("📈 셀러 분석 (Seller Analysis)")
     
     if '셀러명' not in df_filtered.columns:
@@ -347,11 +522,8 @@ with tab4:
         # 1. 셀러 요약 지표
         total_sellers = df_filtered['셀러명'].nunique()
         
-        # 월별 활동 셀러 계산
-        df_monthly = df_filtered.copy()
-        df_monthly['주문월'] = df_monthly['주문일'].dt.to_period('M')
-        
-        monthly_seller_counts = df_monthly.groupby('주문월')['셀러명'].nunique()
+        # 월별 활동 셀러 계산 (사전 계산된 주문월_period 사용, 복사 없음)
+        monthly_seller_counts = df_filtered.groupby('주문월_period')['셀러명'].nunique()
         current_active = monthly_seller_counts.iloc[-1] if not monthly_seller_counts.empty else 0
         
         col_s1, col_s2, col_s3 = st.columns(3)
@@ -366,46 +538,11 @@ with tab4:
         # 전체 기간 데이터가 필요함 (필터링되지 않은 원본 raw_df 사용 권장하지만, 현재 필터 내 분석이면 df_filtered)
         # 유입/이탈은 '전체 기간' 관점이 중요하므로 raw_df를 사용하는 것이 맞을 수 있음.
         # 하지만 사용자가 기간을 선택했으므로, 선택된 기간 내에서의 변동만 보여주는 것이 일관적일 수 있음.
-        # 여기서는 df_filtered를 기준으로 하되, 첫 주문일을 계산.
-        
-        # 각 셀러의 첫 주문일
-        first_order_date = df_filtered.groupby('셀러명')['주문일'].min().reset_index()
-        first_order_date['가입월'] = first_order_date['주문일'].dt.to_period('M')
-        
-        # 각 월별 신규 셀러수
-        new_sellers = first_order_date.groupby('가입월')['셀러명'].count().reset_index()
-        new_sellers.columns = ['월', '신규 유입']
-        new_sellers['월'] = new_sellers['월'].astype(str)
+        # 여기서는 df_filtered를 기준으로 하되, 셀러별 첫 활동 월을 계산.
         
-        # 이탈 (Churn) - 전월에는 있었으나 이번달에는 없는 경우
-        # 월별 활동 리스트
-        periods = sorted(df_monthly['주문월'].unique())
-        churn_data = []
-        
-        if len(periods) > 1:
-            for i in range(1, len(periods)):
-                prev_month = periods[i-1]
-                curr_month = periods[i]
-                
-                prev_sellers = set(df_monthly[df_monthly['주문월'] == prev_month]['셀러명'])
-                curr_sellers = set(df_monthly[df_monthly['주문월'] == curr_month]['셀러명'])
-                
-                churned = len(prev_sellers - curr_sellers)
-                churn_data.append({'월': str(curr_month), '이탈': churned * -1}) # 음수로 표현
-                
-        churn_df = pd.DataFrame(churn_data)
-        
-        # 병합
-        if not new_sellers.empty:
-            analysis_df = new_sellers
-            if not churn_df.empty:
-                analysis_df = pd.merge(analysis_df, churn_df, on='월', how='outer').fillna(0)
-        else:
-             analysis_df = churn_df
+        analysis_df = compute_churn_matrix(df_filtered, filter_key)
 
         if not analysis_df.empty:
-            analysis_df = analysis_df.sort_values('월')
-            
             fig_churn = go.Figure()
             fig_churn.add_trace(go.Bar(x=analysis_df['월'], y=analysis_df['신규 유입'], name='신규 유입', marker_color='green'))
             fig_churn.add_trace(go.Bar(x=analysis_df['월'], y=analysis_df['이탈'], name='이탈', marker_color='red'))
@@ -417,19 +554,23 @@ with tab4:
         st.subheader("📊 셀러별 매출 추이")
         
         # 상위 5명 셀러 기본 선택
-        top_sellers = df_filtered.groupby('셀러명')['실결제 금액'].sum().nlargest(5).index.tolist()
+        top_sellers = df_filtered.groupby('셀러명', observed=True, sort=False)['실결제 금액'].sum().nlargest(5).index.tolist()
         
-        selected_sellers_trend = st.multiselect(
-            "매출 추이를 확인할 셀러 선택", 
-            df_filtered['셀러명'].unique(),
-            default=top_sellers
-        )
+        # 기간 내 활동 셀러 목록 (범주 코드 기준으로 미사용 범주만 제거)
+        seller_choices = df_filtered['셀러명'].cat.remove_unused_categories().cat.categories
+        
+        # 셀러를 여러 명 고르는 동안 매번 재계산하지 않도록 폼 제출 시에만 반영
+        with st.form("seller_trend_form"):
+            selected_sellers_trend = st.multiselect(
+                "매출 추이를 확인할 셀러 선택", 
+                seller_choices,
+                default=top_sellers
+            )
+            st.form_submit_button("매출 추이 보기")
         
         if selected_sellers_trend:
-            trend_df = df_filtered[df_filtered['셀러명'].isin(selected_sellers_trend)]
-            # 월별 or 주별 매출
-            trend_pivot = trend_df.groupby([trend_df['주문일'].dt.to_period('W').astype(str), '셀러명'])['실결제 금액'].sum().reset_index()
-            trend_pivot.columns = ['기간(주)', '셀러명', '매출액']
+            # 주별 매출
+            trend_pivot = compute_weekly_trend(df_filtered, filter_key, tuple(selected_sellers_trend))
             
             fig_trend = px.line(trend_pivot, x='기간(주)', y='매출액', color='셀러명', markers=True)
             st.plotly_chart(fig_trend, use_container_width=True)